@@ -41,12 +41,49 @@ The `ohs.yaml` can look like this:
 ```
 """
 
+import copy
+import functools
+import os
 import yaml
-from yaml.loader import SafeLoader
+try:
+    from yaml import CSafeLoader as SafeLoader
+    _HAVE_LIBYAML = True
+except ImportError:
+    from yaml.loader import SafeLoader
+    _HAVE_LIBYAML = False
 from yaml_include import Constructor
 from pathlib import Path
 
 
+@functools.lru_cache(maxsize=32)
+def _find_config_file(fname, root_str, cwd_str):
+    """
+    Do the actual upward search for `find_config_file`.  Cached so that
+    repeated lookups from the same working directory skip the walk.
+    """
+
+    root = os.path.realpath(root_str)
+    p = os.path.realpath(cwd_str)
+
+    while True:
+        fpath = os.path.join(p, fname)
+        try:
+            os.stat(fpath)
+            return Path(fpath)
+        except FileNotFoundError:
+            pass
+
+        if p == root:
+            break
+
+        parent = os.path.dirname(p)
+        if parent == p:
+            break
+        p = parent
+
+    raise FileNotFoundError("Could not find the config file " + fname)
+
+
 def find_config_file(fname, root=None):
     """
     Search in the current directory and all parent directories all the way up
@@ -61,46 +98,154 @@ def find_config_file(fname, root=None):
     else:
         root_path = Path(root)
 
-    wd = Path.cwd().resolve()
+    return _find_config_file(fname, str(root_path), os.getcwd())
 
-    for p in (wd / "dummy").parents:
-        fpath = p / fname
-        if fpath.exists():
-            return fpath
 
-        if p.samefile(root_path):
-            break
+# The `!include` directive is registered on the loader class once, here.
+# The base directory for resolving included files is read off the loader
+# instance, so each read resolves relative to the file actually being
+# read, instead of whatever base dir was registered by the last call.
+
+_include_constructors = {}
+
+
+def _include_constructor(loader, node):
+    """
+    Handles the `!include` directive, resolving relative to the base
+    directory stored on the loader instance by `_parse_config_file`.
+    """
+
+    base_dir = loader._include_base_dir
+
+    ctor = _include_constructors.get(base_dir)
+    if ctor is None:
+        ctor = Constructor(base_dir=base_dir)
+        _include_constructors[base_dir] = ctor
+
+    return ctor(loader, node)
+
+
+yaml.add_constructor('!include', _include_constructor, SafeLoader)
+
+
+def _open_config(fpath):
+    """
+    Open a config file for the YAML loader.  With the libyaml loader the
+    file is opened in binary mode, so libyaml does the UTF-8 decoding
+    itself in C instead of going through Python's text layer; the
+    pure-Python loader gets a text stream.
+    """
+
+    if _HAVE_LIBYAML:
+        return open(fpath, 'rb')
+
+    return open(fpath, 'r', encoding='utf-8')
 
-    raise FileNotFoundError("Could not find the config file " + fname)
+
+@functools.lru_cache(maxsize=32)
+def _parse_config_file(path_str, mtime_ns):
+    """
+    Parse the YAML file at `path_str`.  The `mtime_ns` argument is only
+    there to make the cache key, so an edited file gets re-parsed.
+    """
+
+    fpath = Path(path_str)
+
+    with _open_config(fpath) as class_conf:
+        loader = SafeLoader(class_conf)
+        loader._include_base_dir = str(fpath.parent)
+        try:
+            config = loader.get_single_data()
+        finally:
+            loader.dispose()
+
+    return config
 
 
 def read_config_file(fpath):
     """
     Read configuration from a YAML file at path `fpath`.  The file
     can include other files using the `!include` directive.
+
+    Results are cached per process, keyed on the resolved path and
+    modification time, so repeated reads of an unchanged file skip the
+    YAML parsing.  Note that edits to `!include`d files alone do not
+    invalidate the cache.
     """
 
-    basedir = fpath.parent
-    Constructor.add_to_loader_class(
-        loader_class=SafeLoader, base_dir=basedir)
+    fpath = Path(fpath)
+    config = _parse_config_file(str(fpath.resolve()), fpath.stat().st_mtime_ns)
 
-    with open(fpath, 'r') as class_conf:
-        config = yaml.load(class_conf, Loader=SafeLoader)
+    return copy.deepcopy(config)
 
-    return config
 
+def _construct_plain(loader, node):
+    """
+    Construct a Python object from a YAML node, leaving `!include`
+    directives unresolved (their file argument is returned as a string
+    instead of loading the file).
+    """
+
+    if node.tag == '!include':
+        return node.value
+
+    if isinstance(node, yaml.MappingNode):
+        return {_construct_plain(loader, key): _construct_plain(loader, value)
+                for key, value in node.value}
+
+    if isinstance(node, yaml.SequenceNode):
+        return [_construct_plain(loader, item) for item in node.value]
+
+    return loader.construct_object(node)
 
-def get_course_config(fname="course.yaml", root=None):
+
+def read_config_header(fpath, keys=('course',)):
+    """
+    Read only the given top-level keys from the YAML file at `fpath`.
+
+    Unlike `read_config_file`, this does not resolve `!include`
+    directives, so none of the included files are opened or parsed.
+    Useful for quick sanity checks that only look at a header field,
+    like the course name or number.
+    """
+
+    wanted = set(keys)
+    header = {}
+
+    with _open_config(fpath) as class_conf:
+        loader = SafeLoader(class_conf)
+        try:
+            node = loader.get_single_node()
+
+            if isinstance(node, yaml.MappingNode):
+                for key_node, value_node in node.value:
+                    if key_node.value in wanted:
+                        header[key_node.value] = _construct_plain(
+                            loader, value_node)
+        finally:
+            loader.dispose()
+
+    return header
+
+
+def get_course_config(fname="course.yaml", root=None, header_only=False):
     """
     Find and read course configuration YAML file.
 
     The parameter `root` limits which part of directory tree to search.
     Defaults to the user home dir.
 
+    With `header_only`, only the top-level `course` key is read and
+    `!include`d files are not loaded at all.
+
     Throws a fit^w^wan exception when file not found.
     """
 
     fpath = find_config_file(fname, root)
+
+    if header_only:
+        return read_config_header(fpath)
+
     return read_config_file(fpath)
 
 
@@ -113,13 +258,13 @@ def comma(items):
     if not items:
         return ""
 
-    start, last = items[:-1], items[-1]
+    if len(items) == 1:
+        return items[0]
 
-    if start:
-        form = "{}, and {}" if len(start) > 1 else "{} and {}"
-        return form.format(", ".join(start), last)
-    else:
-        return last
+    if len(items) == 2:
+        return f"{items[0]} and {items[1]}"
+
+    return f"{', '.join(items[:-1])}, and {items[-1]}"
 
 
 def format_time_list(ls):
@@ -128,7 +273,7 @@ def format_time_list(ls):
     Returns a list of English time interval specifications.
     """
 
-    return ["from {from} to {to}".format(**times) for times in ls]
+    return [f"from {times['from']} to {times['to']}" for times in ls]
 
 
 def markdown_from_hours(d):
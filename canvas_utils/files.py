@@ -2,10 +2,39 @@
 This module deals with uploading files to Canvas.
 """
 
+import os
 import os.path
 import canvas
 
 
+def _existing_files(fnames):
+    """
+    Returns the set of names from `fnames` that exist as regular files.
+    Scans each parent directory once with os.scandir instead of statting
+    every file separately; falls back to os.path.isfile for directories
+    that cannot be scanned.
+    """
+
+    by_dir = {}
+    for fname in fnames:
+        by_dir.setdefault(os.path.dirname(fname), []).append(fname)
+
+    existing = set()
+
+    for directory, names in by_dir.items():
+        try:
+            with os.scandir(directory or '.') as entries:
+                present = {e.name for e in entries if e.is_file()}
+        except OSError:
+            existing.update(n for n in names if os.path.isfile(n))
+            continue
+
+        existing.update(n for n in names
+                        if os.path.basename(n) in present)
+
+    return existing
+
+
 def upload_file(classid, module, fname, directory, title, position, indent=1):
     """
     Uploads file to Canvas to class given by classid in the given directory.
@@ -33,9 +62,10 @@ def upload_files_from_dict(classid, module, pos, fdict):
     """
 
     items = {}
+    existing = _existing_files(fdict)
 
     for fname, props in fdict.items():
-        if os.path.isfile(fname):
+        if fname in existing:
             items[fname] = [upload_file(classid, module, fname,
                                         props[0], props[1], pos)]
             if not pos is None:
@@ -3,7 +3,9 @@ Module for handling Canvas modules and module items
 """
 
 import datetime
+import functools
 from calendar import month_name
+from concurrent.futures import ThreadPoolExecutor
 from enum import IntEnum
 
 import canvas
@@ -14,8 +16,119 @@ from number_parser import parse_ordinal
 
 WWURL = "https://webwork.svsu.edu/webwork2/{}/{}"
 
+
+def _ww_url(wwclass, wwset):
+    """
+    Builds the WeBWorK external tool URL for a class and a set.
+    """
+
+    return f"https://webwork.svsu.edu/webwork2/{wwclass}/{wwset}"
+
+
 INDENTSTR = ">  "
 
+# Precomputed indentation prefixes for the usual indent depths
+_INDENTS = tuple(INDENTSTR * i for i in range(8))
+
+DUE_SUFFIX_FORMAT = "\n\n__Due %m/%d/%y at %H:%M__"
+
+# Month name to month number lookup (month_name[0] is an empty string)
+_MONTH_TO_NUM = {name: i for i, name in enumerate(month_name) if name}
+
+# Per-run lookup caches.  Resolving the same file name, assignment name or
+# assignment group list for many module items should hit the Canvas API only
+# once; misses are cached too (as None), so a missing file is not searched
+# for repeatedly.
+
+_file_lookup_cache = {}
+_assignment_lookup_cache = {}
+_assignment_groups_cache = {}
+
+
+def _lookup_file_id(course, fname):
+    """
+    Find the id of a file with the given name, or None if there is no
+    such file.  Results are cached per (course, fname).
+    """
+
+    key = (course, fname)
+    if key not in _file_lookup_cache:
+        resp = canvas.list_files(course, fname)
+        _file_lookup_cache[key] = resp[0]['id'] if resp else None
+
+    return _file_lookup_cache[key]
+
+
+def _lookup_assignment_id(course, name):
+    """
+    Find the id of an assignment with the given name, or None if there
+    is no such assignment.  Results are cached per (course, name).
+    """
+
+    key = (course, name)
+    if key not in _assignment_lookup_cache:
+        resp = canvas.get_assignments(course, name)
+        _assignment_lookup_cache[key] = resp[0]['id'] if resp else None
+
+    return _assignment_lookup_cache[key]
+
+
+def _get_assignment_groups(course):
+    """
+    List the assignment groups in the course, fetching them from Canvas
+    at most once per course and run.
+    """
+
+    if course not in _assignment_groups_cache:
+        _assignment_groups_cache[course] = canvas.get_assignment_groups(course)
+
+    return _assignment_groups_cache[course]
+
+
+_group_map_cache = {}
+
+
+def _group_id(course, name):
+    """
+    Find the id of the assignment group with the given name.  Falls back
+    to the course's first group when `name` is None or no group matches.
+    The name to id map is built once per course, so adding many
+    assignments does not rescan the group list for each one.
+    """
+
+    if course not in _group_map_cache:
+        groups = _get_assignment_groups(course)
+        _group_map_cache[course] = (
+            groups[0]['id'],
+            {group['name']: group['id'] for group in groups},
+        )
+
+    default, by_name = _group_map_cache[course]
+
+    if name is None:
+        return default
+
+    return by_name.get(name, default)
+
+
+# Cache for module item listings, filled by _cached_list_module_items
+# below and dropped whenever an item is created in the module, so
+# position lookups never see a stale listing.
+
+_module_items_cache = {}
+
+
+def _create_module_item(course, module, *args, **kwargs):
+    """
+    Create a module item through the canvas wrapper, invalidating the
+    cached item listing for the module.
+    """
+
+    resp = canvas.create_module_item(course, module, *args, **kwargs)
+    _module_items_cache.pop((course, module), None)
+
+    return resp
+
 
 class ModuleItem:
     def __init__(self, title, indent=0):
@@ -23,8 +136,12 @@ class ModuleItem:
         self.indent = indent
 
     def __str__(self):
-        return "\n".join([INDENTSTR*self.indent + line for line in
-                         self.__lines__()])
+        if self.indent < len(_INDENTS):
+            prefix = _INDENTS[self.indent]
+        else:
+            prefix = INDENTSTR*self.indent
+
+        return "\n".join([prefix + line for line in self.__lines__()])
 
     def __lines__(self):
         return [self.title]
@@ -35,8 +152,8 @@ class ModuleItem:
 
 class ItemHeader(ModuleItem):
     def create(self, course, module):
-        canvas.create_module_item(course, module, self.title, None,
-                                  "SubHeader", indent=self.indent)
+        _create_module_item(course, module, self.title, None,
+                            "SubHeader", indent=self.indent)
 
 
 class ItemFile(ModuleItem):
@@ -48,19 +165,18 @@ class ItemFile(ModuleItem):
         return ["File:", self.title, self.fname]
 
     def create(self, course, module):
-        resp = canvas.list_files(course, self.fname)
-
         # This is really stoopid, it just takes the first file that was found,
         # so if there is more files with the same name, be careful.  Eventually
         # there should be a way to specify a folder TODO
 
-        if not resp:
+        fileid = _lookup_file_id(course, self.fname)
+
+        if fileid is None:
             print("Creating file item: file ain't there!")
         else:
-            fileid = resp[0]['id']
-            canvas.create_module_item(course, module, self.title, None,
-                                      "File", indent=self.indent,
-                                      content=fileid)
+            _create_module_item(course, module, self.title, None,
+                                "File", indent=self.indent,
+                                content=fileid)
 
 
 class ItemLocalFile(ModuleItem):
@@ -70,6 +186,7 @@ class ItemLocalFile(ModuleItem):
         self.local_file = local_file
         self.remote_path = remote_path
         self.remote_name = remote_name
+        self._fileid = None
 
     def __lines__(self):
         return [
@@ -80,16 +197,27 @@ class ItemLocalFile(ModuleItem):
             str(self.remote_name)
         ]
 
-    def create(self, course, module):
+    def upload(self, course):
+        """
+        Upload the local file to the course and remember the Canvas file
+        id, so a later `create` only has to attach the item.
+        """
+
         resp = canvas.upload_file_to_course(course, self.local_file,
                                             self.remote_path,
                                             self.remote_name)
 
-        fileid = resp['upload']['id']
+        self._fileid = resp['upload']['id']
+
+        return self._fileid
+
+    def create(self, course, module):
+        if self._fileid is None:
+            self.upload(course)
 
-        canvas.create_module_item(course, module, self.title, None,
-                                  "File", indent=self.indent,
-                                  content=fileid)
+        _create_module_item(course, module, self.title, None,
+                            "File", indent=self.indent,
+                            content=self._fileid)
 
 
 class ItemAssignment(ModuleItem):
@@ -108,18 +236,17 @@ class ItemAssignment(ModuleItem):
         ]
 
     def create(self, course, module):
-        resp = canvas.get_assignments(course, self.name)
-
         # This is really stoopid, it just takes the first assignment that was
         # found, so if there is more assignments with the same name, ...
 
-        if not resp:
+        assid = _lookup_assignment_id(course, self.name)
+
+        if assid is None:
             print("Creating assignment item: assignment ain't there!")
         else:
-            assid = resp[0]['id']
-            canvas.create_module_item(course, module, self.title, None,
-                                      "Assignment", indent=self.indent,
-                                      content=assid)
+            _create_module_item(course, module, self.title, None,
+                                "Assignment", indent=self.indent,
+                                content=assid)
 
 
 class ItemAssignmentCreate(ModuleItem):
@@ -171,13 +298,7 @@ class ItemAssignmentCreate(ModuleItem):
 
     def create(self, course, module):
 
-        groups = canvas.get_assignment_groups(course)
-        groupid = groups[0]['id']
-        if self.group is not None:
-            for group in groups:
-                if group['name'] == self.group:
-                    groupid = group['id']
-                    break
+        groupid = _group_id(course, self.group)
 
         resp = canvas.create_assignment(
             course, self.name,
@@ -191,20 +312,17 @@ class ItemAssignmentCreate(ModuleItem):
             ext_tool_new_tab=self.ext_tool_new_tab)
 
         assid = resp['id']
-        canvas.create_module_item(course, module, self.title, None,
-                                  "Assignment", indent=self.indent,
-                                  content=assid)
+        _assignment_lookup_cache[(course, self.name)] = assid
+        _create_module_item(course, module, self.title, None,
+                            "Assignment", indent=self.indent,
+                            content=assid)
 
         if self.announcement is not None:
-            date = datetime.datetime.strptime(
-                self.due_at, "%Y-%m-%dT%H:%M:%S"
-            )
+            date = datetime.datetime.fromisoformat(self.due_at)
             canvas.post_announcement_from_markdown(
                 course,
-                "Assignment {} posted".format(self.name),
-                self.announcement + date.strftime(
-                    "\n\n__Due %m/%d/%y at %H:%M__"
-                )
+                f"Assignment {self.name} posted",
+                self.announcement + date.strftime(DUE_SUFFIX_FORMAT)
             )
 
 
@@ -216,6 +334,7 @@ class ItemWebworkSet(ModuleItem):
         self.wwset = wwset
         self.points = points
         self.deadline = deadline
+        self._deadline_dt = None
         self.group = group
         self.announcement = announcement
         if name is None:
@@ -235,15 +354,9 @@ class ItemWebworkSet(ModuleItem):
         ]
 
     def create(self, course, module):
-        url = WWURL.format(self.wwclass, self.wwset)
+        url = _ww_url(self.wwclass, self.wwset)
 
-        groups = canvas.get_assignment_groups(course)
-        groupid = groups[0]['id']
-        if self.group is not None:
-            for group in groups:
-                if group['name'] == self.group:
-                    groupid = group['id']
-                    break
+        groupid = _group_id(course, self.group)
 
         ass = canvas.create_assignment(course, self.name, "WeBWorK",
                                        self.points, self.deadline, groupid,
@@ -251,21 +364,21 @@ class ItemWebworkSet(ModuleItem):
                                        ext_tool_url=url, ext_tool_new_tab=True)
 
         assid = ass["id"]
+        _assignment_lookup_cache[(course, self.name)] = assid
 
-        canvas.create_module_item(course, module, self.title, None,
-                                  "Assignment", indent=self.indent,
-                                  content=assid)
+        _create_module_item(course, module, self.title, None,
+                            "Assignment", indent=self.indent,
+                            content=assid)
 
         if self.announcement is not None:
-            date = datetime.datetime.strptime(
-                self.deadline, "%Y-%m-%dT%H:%M:%S"
-            )
+            if self._deadline_dt is None:
+                self._deadline_dt = datetime.datetime.fromisoformat(
+                    self.deadline)
             canvas.post_announcement_from_markdown(
                 course,
-                "Assignment {} posted".format(self.name),
-                self.announcement + date.strftime(
-                    "\n\n__Due %m/%d/%y at %H:%M__"
-                )
+                f"Assignment {self.name} posted",
+                self.announcement + self._deadline_dt.strftime(
+                    DUE_SUFFIX_FORMAT)
             )
 
 
@@ -284,9 +397,9 @@ class ItemURL(ModuleItem):
         ]
 
     def create(self, course, module):
-        canvas.create_module_item(course, module, self.title, None,
-                                  "ExternalUrl", indent=self.indent,
-                                  external_url=self.url, new_tab=self.new_tab)
+        _create_module_item(course, module, self.title, None,
+                            "ExternalUrl", indent=self.indent,
+                            external_url=self.url, new_tab=self.new_tab)
 
 
 class ItemUtoob(ItemURL):
@@ -310,39 +423,98 @@ class ItemTool(ModuleItem):
         ]
 
     def create(self, course, module):
-        canvas.create_module_item(course, module, self.title, None,
-                                  "ExternalTool", indent=self.indent,
-                                  external_url=self.url, new_tab=self.new_tab)
+        _create_module_item(course, module, self.title, None,
+                            "ExternalTool", indent=self.indent,
+                            external_url=self.url, new_tab=self.new_tab)
 
 
 # Weekly modules
 
 
+# Cache for module listings, so bulk operations do not refetch the same
+# list from Canvas over and over.  Updated when this module creates a new
+# Canvas module.
+
+_modules_cache = {}
+
+
+def _cached_list_modules(classid, search=None):
+    """
+    List the modules in the class, fetching the full list from Canvas at
+    most once per run.  When `search` is given, filter the cached list
+    locally by case-insensitive substring match on the name.
+    """
+
+    if classid not in _modules_cache:
+        _modules_cache[classid] = canvas.list_modules(classid)
+
+    mlist = _modules_cache[classid]
+
+    if search is None:
+        return mlist
+
+    search = search.lower()
+    return [mod for mod in mlist if search in mod['name'].lower()]
+
+
+def _cached_list_module_items(classid, module, search=None):
+    """
+    List the items in the module, fetching the full list from Canvas at
+    most once per run.  When `search` is given, filter the cached list
+    locally by case-insensitive substring match on the title.
+    """
+
+    key = (classid, module)
+    if key not in _module_items_cache:
+        _module_items_cache[key] = canvas.list_module_items(classid, module)
+
+    itlist = _module_items_cache[key]
+
+    if search is None:
+        return itlist
+
+    search = search.lower()
+    return [it for it in itlist if search in it['title'].lower()]
+
+
 WEEKLY_MODULE_NAME_FORMAT = "Week of {} {}"
 
 
+def _weekly_name(month, day):
+    """
+    Builds a weekly module name, "Week of <Month> <day>".
+    """
+
+    return f"Week of {month} {day}"
+
+
+def _as_date(year, month, day):
+    """
+    Builds a date, accepting the month as either a name or a number.
+    """
+
+    mnum = _MONTH_TO_NUM[month] if isinstance(month, str) else month
+    return datetime.date(year, mnum, day)
+
+
 def create_weekly_module(classid, year, month, day):
     """
     Generate a module name from date (must be Monday!) and create the module
     on Canvas.
     """
 
-    if isinstance(month, str):
-        mnum = list(month_name).index(month)  # Python hait!
-    else:
-        mnum = month
-    date = datetime.date(year, mnum, day)
-
-    assert date.weekday() == 0, "create_weekly_module: date is not a Monday."
+    date = _as_date(year, month, day)
 
-    mname = month_name[mnum]
+    if date.weekday() != 0:
+        raise ValueError("create_weekly_module: date is not a Monday.")
 
     # It looks like specifying position as None place the module at the end
-    resp = canvas.create_module(classid,
-                                WEEKLY_MODULE_NAME_FORMAT.format(mname, day),
-                                None)
+    resp = canvas.create_module(
+        classid, _weekly_name(month_name[date.month], date.day), None)
 
     if 'id' in resp:
+        if classid in _modules_cache:
+            _modules_cache[classid].append(resp)
         return resp['id']
 
     return None
@@ -354,35 +526,26 @@ def module_name(year, month, day):
     "Week of Month day", where the date is always Monday
     """
 
-    if isinstance(month, str):
-        mnum = list(month_name).index(month)  # Python hait!
-    else:
-        mnum = month
-    date = datetime.date(year, mnum, day)
+    date = _as_date(year, month, day)
     monday = date - datetime.timedelta(days=date.weekday())
 
-    mday = monday.day
-    mmonth = month_name[monday.month]
-
-    return WEEKLY_MODULE_NAME_FORMAT.format(mmonth, mday)
+    return _weekly_name(month_name[monday.month], monday.day)
 
 
 # Ordinal modules ("First class", ...)
 
-def drop_last_iter(lst):
-    """Keep removing last item from l while it is nonempty"""
-    while lst:
-        yield lst
-        lst = lst[0:-1]
-
-
+@functools.lru_cache(maxsize=256)
 def get_ordinal_from_name(name):
-    """Gets a name like 'Second class' and translates it into int"""
+    """
+    Gets a name like 'Second class' and translates it into int.
+    Takes the longest prefix of the name that parses as an ordinal.
+    Results are cached, since the same module names come up repeatedly.
+    """
 
     words = name.split()
 
-    for sublist in drop_last_iter(words):
-        parsed = parse_ordinal(" ".join(sublist))
+    for i in range(len(words), 0, -1):
+        parsed = parse_ordinal(" ".join(words[:i]))
         if not (parsed is None):
             return parsed
 
@@ -394,17 +557,17 @@ def get_last_ordinal_module_number(classid):
     Returns the number corresponding to the last ordinal module.
     """
 
-    mlist = canvas.list_modules(classid)
+    mlist = _cached_list_modules(classid)
 
-    numbers = [n for n in (get_ordinal_from_name(mod['name']) for mod in mlist)
-               if not (n is None)]
+    # Weekly modules ("Week of ...") can never be ordinal, so skip the
+    # ordinal parser for them entirely.
+    numbers = (get_ordinal_from_name(mod['name']) for mod in mlist
+               if not mod['name'].startswith("Week of "))
 
-    if numbers:
-        return max(numbers)
-
-    return 0
+    return max((n for n in numbers if not (n is None)), default=0)
 
 
+@functools.lru_cache(maxsize=128)
 def ordinal_module_name(number, suffix="class"):
     """
     Generates a name of an ordinal module, given its number.
@@ -426,10 +589,10 @@ def create_next_ordinal_module(classid, suffix="class"):
     # It looks like specifying position as None place the module at the end
     resp = canvas.create_module(classid, name, None)
 
-    if id in resp:
-        return resp['id']
+    if classid in _modules_cache and 'id' in resp:
+        _modules_cache[classid].append(resp)
 
-    return None
+    return resp.get('id')
 
 
 def get_module_id(classid, name):
@@ -438,7 +601,7 @@ def get_module_id(classid, name):
     if none exists.
     """
 
-    mlist = canvas.list_modules(classid, search=name)
+    mlist = _cached_list_modules(classid, search=name)
 
     if mlist:
         return mlist[0]['id']
@@ -452,12 +615,14 @@ def find_item_position(classid, module, partial_name):
     the total number of items in the module, if there is no match.
     """
 
-    itlist = canvas.list_module_items(classid, module, search=partial_name)
+    itlist = _cached_list_module_items(classid, module)
 
-    if not itlist:
-        return len(canvas.list_module_items(classid, module))
+    partial = partial_name.lower()
+    for item in itlist:
+        if partial in item['title'].lower():
+            return item['position']
 
-    return itlist[0]['position']
+    return len(itlist)
 
 
 def add_text_header(classid, module, text, position=None, indent=0):
@@ -465,8 +630,8 @@ def add_text_header(classid, module, text, position=None, indent=0):
     Add a quick text header.
     """
 
-    resp = canvas.create_module_item(classid, module, text, position,
-                                     "SubHeader", indent)
+    resp = _create_module_item(classid, module, text, position,
+                               "SubHeader", indent)
 
     return resp
 
@@ -499,13 +664,22 @@ class SemesterDates:
         else:
             self.default_due_time = default_due_time
 
+        # Memoized results of week_start and due_day; scripts that post
+        # a whole semester ask for the same handful of dates repeatedly.
+        self._week_start_cache = {}
+        self._due_cache = {}
+
     def week_start(self, week):
         """
         Gives the starting date of the given week. Weeks are numbered
         from 1.
         """
 
-        return self.start_date + datetime.timedelta(weeks=week-1)
+        if week not in self._week_start_cache:
+            self._week_start_cache[week] = (
+                self.start_date + datetime.timedelta(weeks=week-1))
+
+        return self._week_start_cache[week]
 
     def week_and_day(self, week, day):
         """
@@ -524,14 +698,16 @@ class SemesterDates:
         default time set for the class instance.
         """
 
-        date = self.start_date + datetime.timedelta(weeks=week-1, days=day)
+        key = (week, int(day), time)
+        if key not in self._due_cache:
+            date = self.start_date + datetime.timedelta(weeks=week-1,
+                                                        days=day)
 
-        if time is None:
-            time = self.default_due_time
+            due_time = self.default_due_time if time is None else time
 
-        return "{}T{}".format(
-            date.isoformat(), time
-        )
+            self._due_cache[key] = f"{date.isoformat()}T{due_time}"
+
+        return self._due_cache[key]
 
     def due_date(self, date, time=None):
         """
@@ -543,13 +719,47 @@ class SemesterDates:
         if time is None:
             time = self.default_due_time
 
-        return "{}-{}T{}".format(
-            self.start_date.year,
-            date.replace("/", "-"),
-            time)
+        return f'{self.start_date.year}-{date.replace("/", "-")}T{time}'
+
+
+def _create_items(cls, modid, items, max_workers=4):
+    """
+    Create all the given module items, in two phases: the file uploads
+    (the slow, independent part of ItemLocalFile) run in a thread pool,
+    then the items are attached to the module one by one in the given
+    order.  Items are appended to the module (position None), so the
+    serial second phase is what keeps their order deterministic.
+    """
+
+    uploads = [item for item in items if isinstance(item, ItemLocalFile)]
+
+    if len(uploads) > 1 and max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(lambda item: item.upload(cls), uploads))
+
+    for item in items:
+        item.create(cls, modid)
+
+
+def populate_module(course, module, items, max_workers=4):
+    """
+    Create all the given items in an existing module.  File uploads run
+    concurrently; the items themselves are attached in the given order.
+    """
+
+    _create_items(course, module, items, max_workers=max_workers)
 
 
-def post_module(cls, mod, semester_dates, print_only=False):
+def populate_module_parallel(course, module, items, max_workers=4):
+    """
+    Same as `populate_module`: file uploads run concurrently, items are
+    attached in the given order.  Kept as an explicit name for callers.
+    """
+
+    _create_items(course, module, items, max_workers=max_workers)
+
+
+def post_module(cls, mod, semester_dates, print_only=False, max_workers=4):
     """
     Post a weekly module. The module is a dict with fields:
     week: week number, staring with 1
@@ -558,6 +768,9 @@ def post_module(cls, mod, semester_dates, print_only=False):
     semester_dates is an instance of SemesterDates class.
 
     If print_only is true, do not actually post, just print.
+
+    File uploads run concurrently (max_workers threads); the items
+    themselves are posted one by one in the given order.
     """
     week = mod['week']
     start_date = semester_dates.week_start(week)
@@ -566,17 +779,14 @@ def post_module(cls, mod, semester_dates, print_only=False):
     day = start_date.day
     if print_only:
         print(f"==================== Module for {month}/{day}/{year} ====================")
+        for item in mod['items']:
+            print(item)
     else:
         modid = create_weekly_module(cls, year, month, day)
-
-    for item in mod['items']:
-        if print_only:
-            print(item)
-        else:
-            item.create(cls, modid)
+        _create_items(cls, modid, mod['items'], max_workers=max_workers)
 
 
-def update_module(cls, mod, semester_dates, print_only=False):
+def update_module(cls, mod, semester_dates, print_only=False, max_workers=4):
     """
     Update an existing  weekly module. The module is a dict with fields:
     week: week number, staring with 1
@@ -585,6 +795,9 @@ def update_module(cls, mod, semester_dates, print_only=False):
     semester_dates is an instance of SemesterDates class.
 
     If print_only is true, do not actually post, just print.
+
+    File uploads run concurrently (max_workers threads); the items
+    themselves are posted one by one in the given order.
     """
     week = mod['week']
     start_date = semester_dates.week_start(week)
@@ -598,9 +811,8 @@ def update_module(cls, mod, semester_dates, print_only=False):
 
     if modid is None:
         print("Could not find the module")
-    else:
+    elif print_only:
         for item in mod['items']:
-            if print_only:
-                print(item)
-            else:
-                item.create(cls, modid)
+            print(item)
+    else:
+        _create_items(cls, modid, mod['items'], max_workers=max_workers)
@@ -0,0 +1,16 @@
+from setuptools import setup, find_packages
+
+setup(
+    name="canvas_utils",
+    version="0.1.0",
+    description="Utilities for building Canvas courses on top of the "
+                "canvas module from canvas_scripts",
+    packages=find_packages(include=["canvas_utils*"]),
+    python_requires=">=3.7",
+    install_requires=[
+        "PyYAML",
+        "pyyaml-include",
+        "num2words",
+        "number-parser",
+    ],
+)